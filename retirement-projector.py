@@ -1,10 +1,82 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import json
 import numpy as np
-from typing import Dict, List, Tuple
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+# Plotly is imported inside the chart builders so it only loads once a chart is drawn
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+@dataclass
+class Portfolio:
+    """A pre-retirement investment account"""
+    __slots__ = ("name", "initial", "annual", "rate")
+    name: str
+    initial: int
+    annual: int
+    rate: float
+
+@dataclass
+class RetirementAsset:
+    """An asset class in the retirement allocation"""
+    __slots__ = ("name", "allocation", "rate")
+    name: str
+    allocation: float
+    rate: float
+
+# Withdrawal rate options mapped to their fractional values
+_RATE_MAP = {"3%": 0.03, "4%": 0.04, "5%": 0.05, "6%": 0.06, "7%": 0.07}
+
+# Custom CSS, built once at import rather than on every rerun
+_CSS = """
+<style>
+.main {
+    padding-top: 2rem;
+}
+.stSelectbox > div > div {
+    background-color: #f8f9fa;
+}
+.metric-card {
+    background-color: #f8f9fa;
+    padding: 1rem;
+    border-radius: 0.5rem;
+    border-left: 4px solid #1f77b4;
+}
+.portfolio-section {
+    background-color: #ffffff;
+    padding: 1.5rem;
+    border-radius: 0.5rem;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    margin-bottom: 1rem;
+}
+.success-message {
+    background-color: #d4edda;
+    color: #155724;
+    padding: 0.75rem;
+    border-radius: 0.25rem;
+    border-left: 4px solid #28a745;
+    margin-bottom: 1rem;
+}
+.warning-message {
+    background-color: #fff3cd;
+    color: #856404;
+    padding: 0.75rem;
+    border-radius: 0.25rem;
+    border-left: 4px solid #ffc107;
+    margin-bottom: 1rem;
+}
+.error-message {
+    background-color: #f8d7da;
+    color: #721c24;
+    padding: 0.75rem;
+    border-radius: 0.25rem;
+    border-left: 4px solid #dc3545;
+    margin-bottom: 1rem;
+}
+</style>
+"""
 
 def main():
     st.set_page_config(
@@ -15,53 +87,7 @@ def main():
     )
     
     # Custom CSS
-    st.markdown("""
-    <style>
-    .main {
-        padding-top: 2rem;
-    }
-    .stSelectbox > div > div {
-        background-color: #f8f9fa;
-    }
-    .metric-card {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #1f77b4;
-    }
-    .portfolio-section {
-        background-color: #ffffff;
-        padding: 1.5rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        margin-bottom: 1rem;
-    }
-    .success-message {
-        background-color: #d4edda;
-        color: #155724;
-        padding: 0.75rem;
-        border-radius: 0.25rem;
-        border-left: 4px solid #28a745;
-        margin-bottom: 1rem;
-    }
-    .warning-message {
-        background-color: #fff3cd;
-        color: #856404;
-        padding: 0.75rem;
-        border-radius: 0.25rem;
-        border-left: 4px solid #ffc107;
-        margin-bottom: 1rem;
-    }
-    .error-message {
-        background-color: #f8d7da;
-        color: #721c24;
-        padding: 0.75rem;
-        border-radius: 0.25rem;
-        border-left: 4px solid #dc3545;
-        margin-bottom: 1rem;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_CSS, unsafe_allow_html=True)
     
     # Header
     st.title("💰 Retirement Portfolio Calculator")
@@ -70,15 +96,19 @@ def main():
     # Initialize session state
     if 'portfolios' not in st.session_state:
         st.session_state.portfolios = [
-            {"name": "Primary Portfolio", "initial": 50000, "annual": 10000, "rate": 0.07}
+            Portfolio("Primary Portfolio", 50000, 10000, 0.07)
         ]
     
     if 'retirement_portfolios' not in st.session_state:
         st.session_state.retirement_portfolios = [
-            {"name": "Conservative Bonds", "allocation": 0.60, "rate": 0.03},
-            {"name": "Dividend Stocks", "allocation": 0.40, "rate": 0.06}
+            RetirementAsset("Conservative Bonds", 0.60, 0.03),
+            RetirementAsset("Dividend Stocks", 0.40, 0.06)
         ]
     
+    # Last template applied, so a selection is only copied in once
+    st.session_state.setdefault("_applied_template", None)
+    st.session_state.setdefault("_applied_retirement_template", None)
+    
     # Sidebar inputs
     with st.sidebar:
         st.header("📊 Analysis Parameters")
@@ -116,13 +146,13 @@ def main():
         # Withdrawal rates
         withdrawal_rates = st.multiselect(
             "Withdrawal Rates to Test",
-            options=["3%", "4%", "5%", "6%", "7%"],
+            options=list(_RATE_MAP),
             default=["3%", "4%", "5%"],
             help="Annual withdrawal rates as percentage of portfolio value"
         )
         
         # Convert withdrawal rates to floats
-        withdrawal_rates_float = [float(rate.strip('%')) / 100 for rate in withdrawal_rates]
+        withdrawal_rates_float = [_RATE_MAP[rate] for rate in withdrawal_rates]
     
     # Currency symbols
     currency_symbols = {"GBP": "£", "USD": "$", "EUR": "€"}
@@ -146,83 +176,93 @@ def main():
         # Apply template if selected
         if template != "Custom":
             apply_template(template)
+        else:
+            st.session_state._applied_template = None
         
         # Dynamic portfolio input
         st.markdown("### Portfolio Components")
         
-        # Portfolio input form
-        portfolio_container = st.container()
-        with portfolio_container:
+        # Portfolio input form; edits are applied together on submit
+        with st.form("portfolio_edit_form"):
             for i, portfolio in enumerate(st.session_state.portfolios):
                 col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
                 
                 with col1:
-                    portfolio["name"] = st.text_input(
+                    portfolio.name = st.text_input(
                         f"Portfolio Name {i+1}",
-                        value=portfolio["name"],
+                        value=portfolio.name,
                         key=f"name_{i}",
                         placeholder="e.g., 401k, IRA, Stocks"
                     )
                 
                 with col2:
-                    portfolio["initial"] = st.number_input(
+                    portfolio.initial = st.number_input(
                         f"Initial Amount ({symbol})",
                         min_value=0,
-                        value=portfolio["initial"],
+                        value=portfolio.initial,
                         step=1000,
                         key=f"initial_{i}",
                         format="%d"
                     )
                 
                 with col3:
-                    portfolio["annual"] = st.number_input(
+                    portfolio.annual = st.number_input(
                         f"Annual Contribution ({symbol})",
                         min_value=0,
-                        value=portfolio["annual"],
+                        value=portfolio.annual,
                         step=500,
                         key=f"annual_{i}",
                         format="%d"
                     )
                 
                 with col4:
-                    portfolio["rate"] = st.number_input(
+                    portfolio.rate = st.number_input(
                         f"Growth Rate (%)",
                         min_value=0.0,
                         max_value=0.20,
-                        value=portfolio["rate"],
+                        value=portfolio.rate,
                         step=0.01,
                         key=f"rate_{i}",
                         format="%.2f"
                     )
                 
                 with col5:
-                    if st.button("🗑️", key=f"delete_{i}", help="Remove this portfolio"):
-                        if len(st.session_state.portfolios) > 1:
-                            st.session_state.portfolios.pop(i)
-                            st.rerun()
+                    st.checkbox("🗑️", key=f"delete_{i}", help="Remove this portfolio when changes are applied")
+            
+            submitted = st.form_submit_button("Apply changes")
+        
+        if submitted:
+            remove_checked_portfolios("portfolios", "delete_")
         
         # Add/Remove portfolio buttons
         col1, col2, col3 = st.columns([1, 1, 3])
         with col1:
             if st.button("➕ Add Portfolio"):
-                st.session_state.portfolios.append({
-                    "name": f"Portfolio {len(st.session_state.portfolios) + 1}",
-                    "initial": 0,
-                    "annual": 0,
-                    "rate": 0.07
-                })
+                st.session_state.portfolios.append(Portfolio(
+                    name=f"Portfolio {len(st.session_state.portfolios) + 1}",
+                    initial=0,
+                    annual=0,
+                    rate=0.07
+                ))
                 st.rerun()
         
         with col2:
             if st.button("💾 Save Config"):
                 save_portfolio_config()
         
+        # Validated once per run; Tab 3 reuses the result
+        valid_portfolios = validate_portfolios()
+        
         # Show accumulation summary
-        if validate_portfolios():
+        if valid_portfolios:
             st.markdown("### Portfolio Summary")
-            total_initial = sum(p["initial"] for p in st.session_state.portfolios)
-            total_annual = sum(p["annual"] for p in st.session_state.portfolios)
-            weighted_rate = sum(p["initial"] * p["rate"] for p in st.session_state.portfolios) / total_initial if total_initial > 0 else 0
+            portfolios = st.session_state.portfolios
+            inits = np.fromiter((p.initial for p in portfolios), dtype=np.float64, count=len(portfolios))
+            annuals = np.fromiter((p.annual for p in portfolios), dtype=np.float64, count=len(portfolios))
+            rates = np.fromiter((p.rate for p in portfolios), dtype=np.float64, count=len(portfolios))
+            total_initial = inits.sum()
+            total_annual = annuals.sum()
+            weighted_rate = inits @ rates / total_initial if total_initial > 0 else 0
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -246,67 +286,73 @@ def main():
         
         if retirement_template != "Custom":
             apply_retirement_template(retirement_template)
+        else:
+            st.session_state._applied_retirement_template = None
         
         st.markdown("### Retirement Asset Allocation")
         
-        # Retirement portfolio input form
-        retirement_container = st.container()
-        with retirement_container:
+        # Retirement portfolio input form; edits are applied together on submit
+        with st.form("retirement_edit_form"):
             for i, portfolio in enumerate(st.session_state.retirement_portfolios):
                 col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
                 
                 with col1:
-                    portfolio["name"] = st.text_input(
+                    portfolio.name = st.text_input(
                         f"Asset Type {i+1}",
-                        value=portfolio["name"],
+                        value=portfolio.name,
                         key=f"ret_name_{i}",
                         placeholder="e.g., Bonds, Dividend Stocks"
                     )
                 
                 with col2:
-                    portfolio["allocation"] = st.number_input(
+                    portfolio.allocation = st.number_input(
                         f"Allocation (%)",
                         min_value=0.0,
                         max_value=100.0,
-                        value=portfolio["allocation"] * 100,
+                        value=portfolio.allocation * 100,
                         step=5.0,
                         key=f"ret_allocation_{i}",
                         format="%.1f"
                     ) / 100
                 
                 with col3:
-                    portfolio["rate"] = st.number_input(
+                    portfolio.rate = st.number_input(
                         f"Growth Rate (%)",
                         min_value=0.0,
                         max_value=0.15,
-                        value=portfolio["rate"],
+                        value=portfolio.rate,
                         step=0.01,
                         key=f"ret_rate_{i}",
                         format="%.2f"
                     )
                 
                 with col4:
-                    if st.button("🗑️", key=f"ret_delete_{i}", help="Remove this asset"):
-                        if len(st.session_state.retirement_portfolios) > 1:
-                            st.session_state.retirement_portfolios.pop(i)
-                            st.rerun()
+                    st.checkbox("🗑️", key=f"ret_delete_{i}", help="Remove this asset when changes are applied")
+            
+            retirement_submitted = st.form_submit_button("Apply changes")
+        
+        if retirement_submitted:
+            remove_checked_portfolios("retirement_portfolios", "ret_delete_")
         
         # Add retirement portfolio buttons
         col1, col2 = st.columns([1, 1])
         with col1:
             if st.button("➕ Add Retirement Asset"):
-                st.session_state.retirement_portfolios.append({
-                    "name": f"Asset {len(st.session_state.retirement_portfolios) + 1}",
-                    "allocation": 0.0,
-                    "rate": 0.04
-                })
+                st.session_state.retirement_portfolios.append(RetirementAsset(
+                    name=f"Asset {len(st.session_state.retirement_portfolios) + 1}",
+                    allocation=0.0,
+                    rate=0.04
+                ))
                 st.rerun()
         
         # Show retirement allocation summary
         if st.session_state.retirement_portfolios:
             st.markdown("### Retirement Allocation Summary")
-            total_allocation = sum(p["allocation"] for p in st.session_state.retirement_portfolios)
-            blended_rate = sum(p["allocation"] * p["rate"] for p in st.session_state.retirement_portfolios)
+            retirement_portfolios = st.session_state.retirement_portfolios
+            allocations = np.fromiter((p.allocation for p in retirement_portfolios), dtype=np.float64, count=len(retirement_portfolios))
+            rates = np.fromiter((p.rate for p in retirement_portfolios), dtype=np.float64, count=len(retirement_portfolios))
+            total_allocation = allocations.sum()
+            blended_rate = allocations @ rates
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -322,7 +368,6 @@ def main():
     # Tab 3: Analysis & Results
     with tab3:
         # Validate portfolios
-        valid_portfolios = validate_portfolios()
         valid_retirement_portfolios = validate_retirement_portfolios()
         
         if valid_portfolios and valid_retirement_portfolios:
@@ -352,83 +397,99 @@ def apply_template(template_name: str):
     """Apply a predefined portfolio template"""
     templates = {
         "Conservative": [
-            {"name": "Government Bonds", "initial": 30000, "annual": 5000, "rate": 0.03},
-            {"name": "Corporate Bonds", "initial": 20000, "annual": 3000, "rate": 0.04},
-            {"name": "Dividend Stocks", "initial": 15000, "annual": 2000, "rate": 0.06}
+            Portfolio("Government Bonds", 30000, 5000, 0.03),
+            Portfolio("Corporate Bonds", 20000, 3000, 0.04),
+            Portfolio("Dividend Stocks", 15000, 2000, 0.06)
         ],
         "Balanced": [
-            {"name": "Index Funds", "initial": 40000, "annual": 8000, "rate": 0.07},
-            {"name": "Bonds", "initial": 25000, "annual": 4000, "rate": 0.04},
-            {"name": "International Stocks", "initial": 15000, "annual": 3000, "rate": 0.08}
+            Portfolio("Index Funds", 40000, 8000, 0.07),
+            Portfolio("Bonds", 25000, 4000, 0.04),
+            Portfolio("International Stocks", 15000, 3000, 0.08)
         ],
         "Aggressive": [
-            {"name": "Growth Stocks", "initial": 35000, "annual": 7000, "rate": 0.10},
-            {"name": "Tech Stocks", "initial": 25000, "annual": 5000, "rate": 0.12},
-            {"name": "Emerging Markets", "initial": 15000, "annual": 3000, "rate": 0.09}
+            Portfolio("Growth Stocks", 35000, 7000, 0.10),
+            Portfolio("Tech Stocks", 25000, 5000, 0.12),
+            Portfolio("Emerging Markets", 15000, 3000, 0.09)
         ]
     }
     
-    if template_name in templates:
+    if template_name in templates and st.session_state._applied_template != template_name:
         st.session_state.portfolios = templates[template_name]
+        st.session_state._applied_template = template_name
         st.success(f"Applied {template_name} template!")
 
 def apply_retirement_template(template_name: str):
     """Apply a predefined retirement portfolio template"""
     retirement_templates = {
         "Conservative": [
-            {"name": "Treasury Bonds", "allocation": 0.70, "rate": 0.03},
-            {"name": "High-Yield Savings", "allocation": 0.20, "rate": 0.02},
-            {"name": "Dividend Stocks", "allocation": 0.10, "rate": 0.05}
+            RetirementAsset("Treasury Bonds", 0.70, 0.03),
+            RetirementAsset("High-Yield Savings", 0.20, 0.02),
+            RetirementAsset("Dividend Stocks", 0.10, 0.05)
         ],
         "Moderate": [
-            {"name": "Government Bonds", "allocation": 0.50, "rate": 0.03},
-            {"name": "Corporate Bonds", "allocation": 0.30, "rate": 0.04},
-            {"name": "Dividend Stocks", "allocation": 0.20, "rate": 0.06}
+            RetirementAsset("Government Bonds", 0.50, 0.03),
+            RetirementAsset("Corporate Bonds", 0.30, 0.04),
+            RetirementAsset("Dividend Stocks", 0.20, 0.06)
         ],
         "Balanced": [
-            {"name": "Bonds", "allocation": 0.40, "rate": 0.035},
-            {"name": "Dividend Stocks", "allocation": 0.40, "rate": 0.06},
-            {"name": "Growth Stocks", "allocation": 0.20, "rate": 0.08}
+            RetirementAsset("Bonds", 0.40, 0.035),
+            RetirementAsset("Dividend Stocks", 0.40, 0.06),
+            RetirementAsset("Growth Stocks", 0.20, 0.08)
         ]
     }
     
-    if template_name in retirement_templates:
+    if template_name in retirement_templates and st.session_state._applied_retirement_template != template_name:
         st.session_state.retirement_portfolios = retirement_templates[template_name]
+        st.session_state._applied_retirement_template = template_name
+
+def remove_checked_portfolios(state_key: str, delete_key_prefix: str):
+    """Remove entries whose delete checkbox is ticked, always keeping at least one"""
+    entries = st.session_state[state_key]
+    remaining = [
+        entry for i, entry in enumerate(entries)
+        if not st.session_state.get(f"{delete_key_prefix}{i}", False)
+    ]
+    
+    if remaining and len(remaining) < len(entries):
+        # Clear the checkboxes so they don't carry over to the shifted rows
+        for i in range(len(entries)):
+            st.session_state.pop(f"{delete_key_prefix}{i}", None)
+        st.session_state[state_key] = remaining
+        st.rerun()
 
 def validate_portfolios() -> bool:
     """Validate portfolio configurations"""
-    for portfolio in st.session_state.portfolios:
-        if not portfolio["name"].strip():
-            return False
-        if portfolio["initial"] < 0 or portfolio["annual"] < 0 or portfolio["rate"] < 0:
-            return False
-        if portfolio["initial"] == 0 and portfolio["annual"] == 0:
-            return False
-    return True
+    return all(
+        portfolio.name.strip()
+        and portfolio.initial >= 0 and portfolio.annual >= 0 and portfolio.rate >= 0
+        and (portfolio.initial != 0 or portfolio.annual != 0)
+        for portfolio in st.session_state.portfolios
+    )
 
 def validate_retirement_portfolios() -> bool:
     """Validate retirement portfolio configurations"""
     if not st.session_state.retirement_portfolios:
         return False
     
-    total_allocation = sum(p["allocation"] for p in st.session_state.retirement_portfolios)
-    if abs(total_allocation - 1.0) > 0.01:  # Allow 1% tolerance
-        return False
-    
+    total_allocation = 0.0
     for portfolio in st.session_state.retirement_portfolios:
-        if not portfolio["name"].strip():
+        if not portfolio.name.strip():
             return False
-        if portfolio["allocation"] < 0 or portfolio["rate"] < 0:
+        if portfolio.allocation < 0 or portfolio.rate < 0:
             return False
-        if portfolio["allocation"] == 0:
+        if portfolio.allocation == 0:
             return False
+        total_allocation += portfolio.allocation
+    
+    if abs(total_allocation - 1.0) > 0.01:  # Allow 1% tolerance
+        return False
     
     return True
 
 def save_portfolio_config():
     """Save portfolio configuration to JSON"""
     config = {
-        "portfolios": st.session_state.portfolios,
+        "portfolios": [asdict(p) for p in st.session_state.portfolios],
         "timestamp": pd.Timestamp.now().isoformat()
     }
     
@@ -440,106 +501,103 @@ def save_portfolio_config():
         mime="application/json"
     )
 
-def calculate_portfolio_growth(portfolios: List[Dict], years: int) -> pd.DataFrame:
-    """Calculate year-by-year portfolio growth"""
-    results = []
-    
-    for year in range(years + 1):
-        year_data = {"Year": year}
-        total_value = 0
-        
-        for portfolio in portfolios:
-            if year == 0:
-                value = portfolio["initial"]
-            else:
-                # Calculate compound growth with annual contributions
-                value = portfolio["initial"]
-                for y in range(year):
-                    value = (value + portfolio["annual"]) * (1 + portfolio["rate"])
-            
-            year_data[portfolio["name"]] = value
-            total_value += value
-        
-        year_data["Total"] = total_value
-        results.append(year_data)
-    
-    return pd.DataFrame(results)
+@st.cache_data(max_entries=32, show_spinner=False)
+def calculate_portfolio_growth(
+    portfolios: Tuple[Tuple[str, float, float, float], ...],
+    years: int
+) -> pd.DataFrame:
+    """Calculate year-by-year portfolio growth from (name, initial, annual, rate) tuples"""
+    names = [name for name, _, _, _ in portfolios]
+    initials = np.array([initial for _, initial, _, _ in portfolios], dtype=np.float64)
+    annuals = np.array([annual for _, _, annual, _ in portfolios], dtype=np.float64)
+    rates = np.array([rate for _, _, _, rate in portfolios], dtype=np.float64)
+    
+    # Closed form of value = (value + annual) * (1 + rate), applied once per year
+    years_vec = np.arange(years + 1)[:, None]
+    factors = 1.0 + rates
+    
+    # Running product of the yearly factors gives (1 + rate) ** year without pow
+    growth = np.empty((years + 1, len(portfolios)))
+    growth[0] = 1.0
+    np.cumprod(np.broadcast_to(factors, (years, len(portfolios))), axis=0, out=growth[1:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        contributions = np.where(rates > 0, (growth - 1) / rates, years_vec)
+    values = initials * growth + annuals * factors * contributions
+    
+    data = {"Year": np.arange(years + 1)}
+    for i, name in enumerate(names):
+        data[name] = values[:, i]
+    data["Total"] = values.sum(axis=1)
+    
+    return pd.DataFrame(data)
 
+@st.cache_data(max_entries=32, show_spinner=False)
 def calculate_withdrawal_scenarios(
     final_portfolio_value: float,
-    withdrawal_rates: List[float],
+    withdrawal_rates: Tuple[float, ...],
     retirement_years: int,
-    retirement_portfolios: List[Dict]
+    retirement_portfolios: Tuple[Tuple[str, float, float], ...]
 ) -> Dict:
-    """Calculate withdrawal scenarios during retirement using retirement portfolio allocation"""
+    """Calculate withdrawal scenarios during retirement from (name, allocation, rate) tuples"""
     scenarios = {}
     
     # Calculate blended growth rate from retirement portfolio
-    blended_growth_rate = sum(p["allocation"] * p["rate"] for p in retirement_portfolios)
-    
-    for rate in withdrawal_rates:
-        scenario_name = f"{rate:.1%}"
-        annual_withdrawal = final_portfolio_value * rate
-        
-        # Calculate portfolio value over retirement years
-        portfolio_values = []
-        current_value = final_portfolio_value
-        
-        for year in range(retirement_years + 1):
-            if year == 0:
-                portfolio_values.append(current_value)
-            else:
-                # Withdraw at beginning of year, then grow
-                current_value = (current_value - annual_withdrawal) * (1 + blended_growth_rate)
-                portfolio_values.append(max(0, current_value))
-        
-        scenarios[scenario_name] = {
-            "annual_withdrawal": annual_withdrawal,
-            "monthly_withdrawal": annual_withdrawal / 12,
-            "portfolio_values": portfolio_values,
-            "final_value": portfolio_values[-1],
+    blended_growth_rate = sum(allocation * rate for _, allocation, rate in retirement_portfolios)
+    
+    # Withdraw at beginning of year, then grow: closed form of
+    # value = (value - withdrawal) * (1 + g) for every rate and year at once
+    g = blended_growth_rate
+    n = np.arange(retirement_years + 1)
+    factor = 1.0 + g
+    gf = factor ** n
+    annuity = factor * (gf - 1) / g if g != 0 else n
+    
+    rates_arr = np.asarray(withdrawal_rates, dtype=np.float64)
+    W = final_portfolio_value * rates_arr[:, None]
+    values = np.maximum(final_portfolio_value * gf[None, :] - W * annuity, 0)
+    
+    # All arithmetic is done above; this loop only assembles the per-rate dicts
+    annual_withdrawals = W[:, 0].tolist()
+    portfolio_values_all = values.tolist()
+    
+    for i, rate in enumerate(withdrawal_rates):
+        scenarios[f"{rate:.1%}"] = {
+            "annual_withdrawal": annual_withdrawals[i],
+            "monthly_withdrawal": annual_withdrawals[i] / 12,
+            "portfolio_values": portfolio_values_all[i],
+            "final_value": portfolio_values_all[i][-1],
             "blended_rate": blended_growth_rate
         }
     
     return scenarios
 
-def display_portfolio_analysis(
-    years_to_retirement: int,
-    retirement_length: int,
-    withdrawal_rates: List[float],
+@st.cache_resource(max_entries=16)
+def build_growth_figure(
+    growth_values: Tuple[np.ndarray, ...],
+    names: Tuple[str, ...],
+    totals: np.ndarray,
     symbol: str
-):
-    """Display comprehensive portfolio analysis"""
-    
-    # Calculate portfolio growth
-    growth_df = calculate_portfolio_growth(st.session_state.portfolios, years_to_retirement)
-    
-    # Calculate initial portfolio value for growth calculations
-    total_initial = sum(p["initial"] for p in st.session_state.portfolios)
-    
-    # Show projected retirement value
-    final_value = growth_df["Total"].iloc[-1]
-    st.metric("🎯 Projected Retirement Portfolio Value", f"{symbol}{final_value:,.0f}")
-    
-    # Portfolio growth chart
-    st.subheader("📈 Portfolio Growth Projection")
+) -> "go.Figure":
+    """Build the accumulation chart from per-portfolio and total value series"""
+    import plotly.graph_objects as go
     
     fig_growth = go.Figure()
+    years = np.arange(len(totals))
     
     # Add lines for each portfolio component
-    for portfolio in st.session_state.portfolios:
+    for name, values in zip(names, growth_values):
         fig_growth.add_trace(go.Scatter(
-            x=growth_df["Year"],
-            y=growth_df[portfolio["name"]],
+            x=years,
+            y=values,
             mode='lines',
-            name=portfolio["name"],
+            name=name,
             line=dict(width=2)
         ))
     
     # Add total portfolio line (highlighted)
     fig_growth.add_trace(go.Scatter(
-        x=growth_df["Year"],
-        y=growth_df["Total"],
+        x=years,
+        y=totals,
         mode='lines',
         name="Total Portfolio",
         line=dict(width=4, color='#1f77b4')
@@ -553,6 +611,77 @@ def display_portfolio_analysis(
         height=500
     )
     
+    return fig_growth
+
+@st.cache_resource(max_entries=16)
+def build_retirement_figure(
+    scenario_rows: Tuple[Tuple[str, np.ndarray], ...],
+    symbol: str
+) -> "go.Figure":
+    """Build the retirement timeline chart from (rate name, portfolio values) rows"""
+    import plotly.graph_objects as go
+    
+    fig_retirement = go.Figure()
+    
+    # WebGL traces keep the marker-heavy timeline cheap to serialize and render
+    for rate_name, portfolio_values in scenario_rows:
+        fig_retirement.add_trace(go.Scattergl(
+            x=np.arange(len(portfolio_values)),
+            y=portfolio_values,
+            mode='lines+markers',
+            name=f"{rate_name} Withdrawal",
+            line=dict(width=3)
+        ))
+    
+    fig_retirement.update_layout(
+        title="Portfolio Value During Retirement",
+        xaxis_title="Years into Retirement",
+        yaxis_title=f"Portfolio Value ({symbol})",
+        hovermode='x unified',
+        height=500
+    )
+    
+    return fig_retirement
+
+def display_portfolio_analysis(
+    years_to_retirement: int,
+    retirement_length: int,
+    withdrawal_rates: List[float],
+    symbol: str
+):
+    """Display comprehensive portfolio analysis"""
+    
+    # Calculate portfolio growth
+    # Hashable snapshots of session state so the cached calculations can be reused
+    portfolio_inputs = tuple(
+        (p.name, p.initial, p.annual, p.rate) for p in st.session_state.portfolios
+    )
+    retirement_inputs = tuple(
+        (p.name, p.allocation, p.rate) for p in st.session_state.retirement_portfolios
+    )
+    
+    growth_df = calculate_portfolio_growth(portfolio_inputs, years_to_retirement)
+    
+    # Calculate initial portfolio value for growth calculations
+    total_initial = sum(p.initial for p in st.session_state.portfolios)
+    
+    # Show projected retirement value
+    # Year equals the row position, so milestones index the totals directly
+    totals = growth_df["Total"].to_numpy()
+    final_value = totals[-1]
+    st.metric("🎯 Projected Retirement Portfolio Value", f"{symbol}{final_value:,.0f}")
+    
+    # Portfolio growth chart
+    st.subheader("📈 Portfolio Growth Projection")
+    
+    names = tuple(p.name for p in st.session_state.portfolios)
+    fig_growth = build_growth_figure(
+        tuple(growth_df[name].to_numpy() for name in names),
+        names,
+        totals,
+        symbol
+    )
+    
     st.plotly_chart(fig_growth, use_container_width=True)
     
     # Accumulation summary table
@@ -563,62 +692,68 @@ def display_portfolio_analysis(
     
     for year in milestone_years:
         if year <= years_to_retirement:
-            row_data = growth_df[growth_df["Year"] == year].iloc[0]
-            milestone_data.append({
-                "Milestone": f"Year {year}",
-                "Total Value": f"{symbol}{row_data['Total']:,.0f}",
-                "Growth": f"{symbol}{row_data['Total'] - total_initial:,.0f}"
-            })
-    
-    milestone_df = pd.DataFrame(milestone_data)
-    st.dataframe(milestone_df, use_container_width=True, hide_index=True)
+            milestone_data.append((f"Year {year}", totals[year], totals[year] - total_initial))
+    
+    # Keep values numeric and let the Styler handle currency formatting
+    milestone_df = pd.DataFrame.from_records(
+        milestone_data, columns=["Milestone", "Total Value", "Growth"]
+    ).astype({"Total Value": "float64", "Growth": "float64"})
+    currency_format = f"{symbol}{{:,.0f}}"
+    st.dataframe(
+        milestone_df.style.format({"Total Value": currency_format, "Growth": currency_format}),
+        use_container_width=True,
+        hide_index=True
+    )
     
     # Withdrawal scenarios
     if withdrawal_rates:
         st.subheader("🏦 Retirement Withdrawal Analysis")
         
-        final_value = growth_df["Total"].iloc[-1]
         scenarios = calculate_withdrawal_scenarios(
-            final_value, withdrawal_rates, retirement_length, st.session_state.retirement_portfolios
+            float(final_value), tuple(withdrawal_rates), retirement_length, retirement_inputs
         )
         
         # Withdrawal scenarios comparison
         scenario_data = []
         for rate_name, scenario in scenarios.items():
-            scenario_data.append({
-                "Withdrawal Rate": rate_name,
-                "Annual Income": f"{symbol}{scenario['annual_withdrawal']:,.0f}",
-                "Monthly Income": f"{symbol}{scenario['monthly_withdrawal']:,.0f}",
-                "Final Portfolio Value": f"{symbol}{scenario['final_value']:,.0f}",
-                "Sustainable": "✅" if scenario['final_value'] > 0 else "❌",
-                "Blended Rate": f"{scenario['blended_rate']:.1%}"
-            })
+            scenario_data.append((
+                rate_name,
+                scenario['annual_withdrawal'],
+                scenario['monthly_withdrawal'],
+                scenario['final_value'],
+                scenario['final_value'] > 0,
+                scenario['blended_rate']
+            ))
         
-        scenario_df = pd.DataFrame(scenario_data)
-        st.dataframe(scenario_df, use_container_width=True, hide_index=True)
+        scenario_df = pd.DataFrame.from_records(
+            scenario_data,
+            columns=["Withdrawal Rate", "Annual Income", "Monthly Income",
+                     "Final Portfolio Value", "Sustainable", "Blended Rate"]
+        ).astype({
+            "Annual Income": "float64",
+            "Monthly Income": "float64",
+            "Final Portfolio Value": "float64",
+            "Sustainable": "bool",
+            "Blended Rate": "float64"
+        })
+        st.dataframe(
+            scenario_df.style.format({
+                "Annual Income": currency_format,
+                "Monthly Income": currency_format,
+                "Final Portfolio Value": currency_format,
+                "Sustainable": lambda sustainable: "✅" if sustainable else "❌",
+                "Blended Rate": "{:.1%}"
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
         
         # Retirement timeline chart
         st.subheader("📊 Retirement Portfolio Timeline")
         
-        fig_retirement = go.Figure()
-        
-        years_retirement = list(range(retirement_length + 1))
-        
-        for rate_name, scenario in scenarios.items():
-            fig_retirement.add_trace(go.Scatter(
-                x=years_retirement,
-                y=scenario['portfolio_values'],
-                mode='lines+markers',
-                name=f"{rate_name} Withdrawal",
-                line=dict(width=3)
-            ))
-        
-        fig_retirement.update_layout(
-            title="Portfolio Value During Retirement",
-            xaxis_title="Years into Retirement",
-            yaxis_title=f"Portfolio Value ({symbol})",
-            hovermode='x unified',
-            height=500
+        fig_retirement = build_retirement_figure(
+            tuple((rate_name, np.asarray(scenario['portfolio_values'])) for rate_name, scenario in scenarios.items()),
+            symbol
         )
         
         st.plotly_chart(fig_retirement, use_container_width=True)